@@ -0,0 +1,53 @@
+# conftest.py
+
+import functools
+
+import httpx
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse
+
+from litellm.proxy._types import ProxyException
+from litellm.proxy.management_endpoints.customer_endpoints import router
+
+
+async def openai_exception_handler(request: Request, exc: ProxyException):
+    headers = exc.headers
+    error_dict = exc.to_dict()
+    return JSONResponse(
+        status_code=(
+            int(exc.code) if exc.code else status.HTTP_500_INTERNAL_SERVER_ERROR
+        ),
+        content={"error": error_dict},
+        headers=headers,
+    )
+
+
+@functools.cache
+def make_customer_test_app() -> FastAPI:
+    """
+    Build the customer endpoints test app once per process.
+    """
+    app = FastAPI()
+    app.add_exception_handler(ProxyException, openai_exception_handler)
+    app.include_router(router)
+    return app
+
+
+@pytest_asyncio.fixture(scope="session")
+async def customer_client():
+    """
+    Shared async client for the customer endpoints router.
+
+    Requests go straight to the app over ASGITransport, avoiding the portal
+    thread TestClient spins up per call.
+    """
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=make_customer_test_app()),
+        base_url="http://testserver",
+    ) as test_client:
+        # Warm up: the first request builds Starlette's middleware stack and walks
+        # the route table. An unmatched path does this without hitting auth or db.
+        await test_client.get("/__warmup__")
+        yield test_client
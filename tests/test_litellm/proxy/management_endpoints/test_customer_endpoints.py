@@ -1,79 +1,93 @@
-from unittest.mock import AsyncMock, patch
+from types import MappingProxyType
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
-from fastapi import FastAPI, HTTPException, Request, status
-from fastapi.responses import JSONResponse
-from fastapi.testclient import TestClient
 
 from litellm.proxy._types import (
     LiteLLM_BudgetTable,
     LiteLLM_EndUserTable,
     LitellmUserRoles,
-    ProxyException,
 )
 from litellm.proxy.auth.user_api_key_auth import UserAPIKeyAuth
-from litellm.proxy.management_endpoints.customer_endpoints import router
 
-app = FastAPI()
+# Opt-in: only honoured with `pytest -n <N> --dist loadgroup`, which keeps this
+# module on one worker so the session client and module-scoped patches are set
+# up once. The default `load` distribution (Makefile, CI) ignores it.
+pytestmark = pytest.mark.xdist_group(name="customer_endpoints")
 
+_AUTH_HEADERS = MappingProxyType({"Authorization": "Bearer test-key"})
 
-@app.exception_handler(ProxyException)
-async def openai_exception_handler(request: Request, exc: ProxyException):
-    headers = exc.headers
-    error_dict = exc.to_dict()
-    return JSONResponse(
-        status_code=(
-            int(exc.code) if exc.code else status.HTTP_500_INTERNAL_SERVER_ERROR
-        ),
-        content={"error": error_dict},
-        headers=headers,
-    )
-
-
-app.include_router(router)
-client = TestClient(app)
-
+# Built once at import; endpoints only read these, so tests can share them.
+_MOCK_END_USER = LiteLLM_EndUserTable(
+    user_id="test-user-1", alias="Test User", blocked=False
+)
+_UPDATED_END_USER = LiteLLM_EndUserTable(
+    user_id="test-user-1", alias="Updated Test User", blocked=False
+)
 
-@pytest.fixture
-def mock_prisma_client():
-    with patch("litellm.proxy.proxy_server.prisma_client") as mock:
-        yield mock
 
+def _validate_error_schema(response_json):
+    assert "error" in response_json, "Response should have 'error' key"
+    error = response_json["error"]
+    assert "message" in error, "Error should have 'message' field"
+    assert "type" in error, "Error should have 'type' field"
+    assert "param" in error, "Error should have 'param' field"
+    assert "code" in error, "Error should have 'code' field"
+    assert isinstance(error["message"], str), "message should be a string"
+    assert isinstance(error["type"], str), "type should be a string"
+    assert isinstance(error["code"], str), "code should be a string"
+    return error
 
-@pytest.fixture
-def mock_user_api_key_auth():
-    with patch("litellm.proxy.proxy_server.user_api_key_auth") as mock:
-        mock.return_value = UserAPIKeyAuth(
-            user_id="test-user", user_role=LitellmUserRoles.PROXY_ADMIN
-        )
-        yield mock
 
+@pytest.fixture(scope="module")
+def mock_prisma_client(request):
+    """
+    Patch prisma_client once per module. Module (not session) scope so the patch
+    is applied after conftest's module-scoped reload of litellm.proxy.proxy_server.
 
-def test_update_customer_success(mock_prisma_client, mock_user_api_key_auth):
-    # Mock the database responses
-    mock_end_user = LiteLLM_EndUserTable(
-        user_id="test-user-1", alias="Test User", blocked=False
-    )
-    updated_mock_end_user = LiteLLM_EndUserTable(
-        user_id="test-user-1", alias="Updated Test User", blocked=False
+    The end user table methods are created once; tests reset the mock at the top
+    and only set return_value / side_effect instead of reassigning attributes.
+    """
+    mock = MagicMock()
+    end_user_table = mock.db.litellm_endusertable
+    end_user_table.find_first = AsyncMock()
+    end_user_table.find_many = AsyncMock()
+    end_user_table.update = AsyncMock()
+    end_user_table.create = AsyncMock()
+    patcher = patch("litellm.proxy.proxy_server.prisma_client", mock)
+    patcher.start()
+    request.addfinalizer(patcher.stop)
+    yield mock
+
+
+@pytest.fixture(scope="module")
+def mock_user_api_key_auth(request):
+    patcher = patch("litellm.proxy.proxy_server.user_api_key_auth")
+    mock = patcher.start()
+    request.addfinalizer(patcher.stop)
+    mock.return_value = UserAPIKeyAuth(
+        user_id="test-user", user_role=LitellmUserRoles.PROXY_ADMIN
     )
+    yield mock
 
+
+@pytest.mark.asyncio
+async def test_update_customer_success(
+    customer_client, mock_prisma_client, mock_user_api_key_auth
+):
+    mock_prisma_client.reset_mock(return_value=True, side_effect=True)
     # Mock the find_first response
-    mock_prisma_client.db.litellm_endusertable.find_first = AsyncMock(
-        return_value=mock_end_user
-    )
+    mock_prisma_client.db.litellm_endusertable.find_first.return_value = _MOCK_END_USER
 
     # Mock the update response
-    mock_prisma_client.db.litellm_endusertable.update = AsyncMock(
-        return_value=updated_mock_end_user
-    )
+    mock_prisma_client.db.litellm_endusertable.update.return_value = _UPDATED_END_USER
 
     # Test data
     test_data = {"user_id": "test-user-1", "alias": "Updated Test User"}
 
     # Make the request
-    response = client.post(
-        "/customer/update", json=test_data, headers={"Authorization": "Bearer test-key"}
+    response = await customer_client.post(
+        "/customer/update", json=test_data, headers=_AUTH_HEADERS
     )
 
     # Assert response
@@ -82,154 +96,117 @@ def test_update_customer_success(mock_prisma_client, mock_user_api_key_auth):
     assert response.json()["alias"] == "Updated Test User"
 
 
-def test_update_customer_not_found(mock_prisma_client, mock_user_api_key_auth):
-    """
-    Test that update_end_user raises a 404 ProxyException when user_id does not exist.
-    """
-    # Mock the database response to return None (user not found)
-    mock_prisma_client.db.litellm_endusertable.find_first = AsyncMock(return_value=None)
-
-    # Test data
-    test_data = {"user_id": "non-existent-user", "alias": "Test User"}
-
-    # Make the request
-    response = client.post(
-        "/customer/update",
-        json=test_data,
-        headers={"Authorization": "Bearer test-key"},
-    )
-
-    # Assert response
-    assert response.status_code == 404
-    response_json = response.json()
-    assert "error" in response_json
-    assert response_json["error"]["message"] == "End User Id=non-existent-user does not exist in db"
-    assert response_json["error"]["type"] == "not_found"
-    assert response_json["error"]["param"] == "user_id"
-    assert response_json["error"]["code"] == "404"
-
-
-def test_info_customer_not_found(mock_prisma_client, mock_user_api_key_auth):
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "method,url,json_body,param,message",
+    [
+        (
+            "post",
+            "/customer/update",
+            {"user_id": "non-existent-user", "alias": "Test User"},
+            "user_id",
+            "End User Id=non-existent-user does not exist in db",
+        ),
+        (
+            "get",
+            "/customer/info?end_user_id=non-existent-user",
+            None,
+            "end_user_id",
+            "End User Id=non-existent-user does not exist in db",
+        ),
+        (
+            "post",
+            "/customer/delete",
+            {"user_ids": ["non-existent-user-1", "non-existent-user-2"]},
+            "user_ids",
+            "End User Id(s)=non-existent-user-1, non-existent-user-2 do not exist in db",
+        ),
+    ],
+)
+async def test_customer_not_found(
+    customer_client,
+    mock_prisma_client,
+    mock_user_api_key_auth,
+    method,
+    url,
+    json_body,
+    param,
+    message,
+):
     """
-    Test that end_user_info raises a 404 ProxyException when end_user_id does not exist.
+    Test that update/info/delete raise a 404 ProxyException, in the standard
+    error schema, when the customer does not exist.
     """
-    # Mock the database response to return None (user not found)
-    mock_prisma_client.db.litellm_endusertable.find_first = AsyncMock(return_value=None)
+    mock_prisma_client.reset_mock(return_value=True, side_effect=True)
+    # Mock the database responses (user not found)
+    mock_prisma_client.db.litellm_endusertable.find_first.return_value = None
+    mock_prisma_client.db.litellm_endusertable.find_many.return_value = []
 
-    # Make the request
-    response = client.get(
-        "/customer/info?end_user_id=non-existent-user",
-        headers={"Authorization": "Bearer test-key"},
-    )
+    kwargs = {"headers": _AUTH_HEADERS}
+    if json_body is not None:
+        kwargs["json"] = json_body
+    response = await getattr(customer_client, method)(url, **kwargs)
 
-    # Assert response
     assert response.status_code == 404
-    response_json = response.json()
-    assert "error" in response_json
-    assert response_json["error"]["message"] == "End User Id=non-existent-user does not exist in db"
-    assert response_json["error"]["type"] == "not_found"
-    assert response_json["error"]["param"] == "end_user_id"
-    assert response_json["error"]["code"] == "404"
-
+    error = _validate_error_schema(response.json())
+    assert error["message"] == message
+    assert error["type"] == "not_found"
+    assert error["param"] == param
+    assert error["code"] == "404"
 
-def test_delete_customer_not_found(mock_prisma_client, mock_user_api_key_auth):
-    """
-    Test that delete_end_user raises a 404 ProxyException when user_ids do not exist.
-    """
-    # Mock the database response to return empty list (no users found)
-    mock_prisma_client.db.litellm_endusertable.find_many = AsyncMock(return_value=[])
 
-    # Test data
-    test_data = {"user_ids": ["non-existent-user-1", "non-existent-user-2"]}
-
-    # Make the request
-    response = client.post(
-        "/customer/delete",
-        json=test_data,
-        headers={"Authorization": "Bearer test-key"},
-    )
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "rows,expected_user_ids",
+    [
+        ([], []),
+        ([_MOCK_END_USER], ["test-user-1"]),
+        (
+            [_MOCK_END_USER, _MOCK_END_USER.model_copy(update={"user_id": "test-user-2"})],
+            ["test-user-1", "test-user-2"],
+        ),
+    ],
+)
+async def test_list_customers(
+    customer_client,
+    mock_prisma_client,
+    mock_user_api_key_auth,
+    rows,
+    expected_user_ids,
+):
+    mock_prisma_client.reset_mock(return_value=True, side_effect=True)
+    mock_prisma_client.db.litellm_endusertable.find_many.return_value = rows
+
+    response = await customer_client.get("/customer/list", headers=_AUTH_HEADERS)
 
-    # Assert response
-    assert response.status_code == 404
-    response_json = response.json()
-    assert "error" in response_json
-    assert "do not exist in db" in response_json["error"]["message"]
-    assert "non-existent-user-1" in response_json["error"]["message"]
-    assert response_json["error"]["type"] == "not_found"
-    assert response_json["error"]["param"] == "user_ids"
-    assert response_json["error"]["code"] == "404"
+    assert response.status_code == 200
+    assert [item["user_id"] for item in response.json()] == expected_user_ids
 
 
-def test_error_schema_consistency(mock_prisma_client, mock_user_api_key_auth):
+@pytest.mark.asyncio
+async def test_new_customer_duplicate_error_schema(
+    customer_client, mock_prisma_client, mock_user_api_key_auth
+):
     """
-    Test that all customer endpoints return the same error schema format.
-    All ProxyException errors should have: message, type, param, and code fields.
+    Test that a duplicate /customer/new returns a 400 in the standard error schema.
     """
-    
-    def validate_error_schema(response_json):
-        assert "error" in response_json, "Response should have 'error' key"
-        error = response_json["error"]
-        assert "message" in error, "Error should have 'message' field"
-        assert "type" in error, "Error should have 'type' field"
-        assert "param" in error, "Error should have 'param' field"
-        assert "code" in error, "Error should have 'code' field"
-        assert isinstance(error["message"], str), "message should be a string"
-        assert isinstance(error["type"], str), "type should be a string"
-        assert isinstance(error["code"], str), "code should be a string"
-        return error
-
-    # Test /customer/info - not found error
-    mock_prisma_client.db.litellm_endusertable.find_first = AsyncMock(return_value=None)
-    response = client.get(
-        "/customer/info?end_user_id=non-existent",
-        headers={"Authorization": "Bearer test-key"},
-    )
-    error = validate_error_schema(response.json())
-    assert error["type"] == "not_found"
-    assert error["code"] == "404"
+    mock_prisma_client.reset_mock(return_value=True, side_effect=True)
 
-    # Test /customer/update - not found error
-    mock_prisma_client.db.litellm_endusertable.find_first = AsyncMock(return_value=None)
-    response = client.post(
-        "/customer/update",
-        json={"user_id": "non-existent", "alias": "Test"},
-        headers={"Authorization": "Bearer test-key"},
-    )
-    error = validate_error_schema(response.json())
-    assert error["type"] == "not_found"
-    assert error["code"] == "404"
-
-    # Test /customer/delete - not found error
-    mock_prisma_client.db.litellm_endusertable.find_many = AsyncMock(return_value=[])
-    response = client.post(
-        "/customer/delete",
-        json={"user_ids": ["non-existent"]},
-        headers={"Authorization": "Bearer test-key"},
-    )
-    error = validate_error_schema(response.json())
-    assert error["type"] == "not_found"
-    assert error["code"] == "404"
-
-    # Test /customer/new - duplicate user error
-    from unittest.mock import MagicMock
-    
-    mock_end_user = LiteLLM_EndUserTable(
-        user_id="existing-user", alias="Existing User", blocked=False
-    )
-    mock_prisma_client.db.litellm_endusertable.create = AsyncMock(
-        side_effect=Exception("Unique constraint failed on the fields: (`user_id`)")
+    mock_prisma_client.db.litellm_endusertable.create.side_effect = Exception(
+        "Unique constraint failed on the fields: (`user_id`)"
     )
-    response = client.post(
+    response = await customer_client.post(
         "/customer/new",
         json={"user_id": "existing-user"},
-        headers={"Authorization": "Bearer test-key"},
+        headers=_AUTH_HEADERS,
     )
-    error = validate_error_schema(response.json())
+    error = _validate_error_schema(response.json())
     assert error["type"] == "bad_request"
     assert error["code"] == "400"
 
 
-def test_customer_endpoints_error_schema_consistency(mock_prisma_client, mock_user_api_key_auth):
+@pytest.mark.asyncio
+async def test_customer_endpoints_error_schema_consistency(customer_client, mock_prisma_client, mock_user_api_key_auth):
     """
     Test the exact scenarios from the curl examples provided.
     
@@ -242,14 +219,15 @@ def test_customer_endpoints_error_schema_consistency(mock_prisma_client, mock_us
     
     Both should use the same error format structure.
     """
+    mock_prisma_client.reset_mock(return_value=True, side_effect=True)
     
     # Scenario 1: GET /end_user/info with non-existent user
     # Should return 404 with proper error schema
-    mock_prisma_client.db.litellm_endusertable.find_first = AsyncMock(return_value=None)
+    mock_prisma_client.db.litellm_endusertable.find_first.return_value = None
     
-    response1 = client.get(
+    response1 = await customer_client.get(
         "/end_user/info?end_user_id=fake-test-end-user-michaels-local-testng",
-        headers={"Authorization": "Bearer test-key"},
+        headers=_AUTH_HEADERS,
     )
     
     assert response1.status_code == 404, "Should return 404 for non-existent user"
@@ -269,14 +247,14 @@ def test_customer_endpoints_error_schema_consistency(mock_prisma_client, mock_us
     
     # Scenario 2: POST /end_user/new with existing user
     # Should return 400 with proper error schema
-    mock_prisma_client.db.litellm_endusertable.create = AsyncMock(
-        side_effect=Exception("Unique constraint failed on the fields: (`user_id`)")
+    mock_prisma_client.db.litellm_endusertable.create.side_effect = Exception(
+        "Unique constraint failed on the fields: (`user_id`)"
     )
     
-    response2 = client.post(
+    response2 = await customer_client.post(
         "/end_user/new",
         json={"user_id": "fake-test-end-user-michaels-local-testing", "budget_id": "Tier0"},
-        headers={"Authorization": "Bearer test-key"},
+        headers=_AUTH_HEADERS,
     )
     
     assert response2.status_code == 400, "Should return 400 for duplicate user"